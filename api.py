@@ -1,17 +1,19 @@
 import os
+import time
 import logging
+import threading
+from collections import Counter
 from datetime import datetime
 from urllib.parse import unquote
+from concurrent.futures import ThreadPoolExecutor
 
-from flask import Flask, jsonify, request, send_from_directory, make_response
+from flask import Blueprint, Flask, current_app, g, jsonify, request, send_from_directory, make_response
 from flask_cors import CORS
-import pymysql
-from pymysql.cursors import DictCursor
 import requests
 from dotenv import load_dotenv
 
-# Monkey patch BEFORE doing anything else
-pymysql.install_as_MySQLdb()
+from db import ConnectionPool, load_driver
+from related import RelatedIndex
 
 # Load environment variables
 load_dotenv()
@@ -20,46 +22,92 @@ load_dotenv()
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-# Create Flask app
-app = Flask(__name__, static_folder="build", static_url_path="/")
-CORS(app)
+api = Blueprint("api", __name__)
+
+MOVIE_SELECT = """
+    SELECT m.*, c.name AS category_name, d.name AS dj_name
+    FROM movies m
+    LEFT JOIN categories c ON m.category_id = c.id
+    LEFT JOIN djs d ON m.dj_id = d.id
+"""
+
+# Settings read from the environment; anything passed to create_app() overrides them
+def load_config():
+    return {
+        # "pymysql" or "mysql-connector", see benchmark_drivers.py
+        "DB_DRIVER": os.environ.get("DB_DRIVER", "pymysql"),
+        "DB_HOST": os.environ.get("DB_HOST"),
+        "DB_PORT": os.environ.get("DB_PORT"),
+        "DB_USER": os.environ.get("DB_USER"),
+        "DB_PASSWORD": os.environ.get("DB_PASSWORD"),
+        "DB_NAME": os.environ.get("DB_NAME"),
+        "DB_POOL_SIZE": int(os.environ.get("DB_POOL_SIZE", 5)),
+        # Only used by `python api.py`; production runs under gunicorn
+        "DEBUG": os.environ.get("FLASK_DEBUG", "").lower() in ("1", "true", "yes"),
+        "API_HOST": os.environ.get("API_HOST", "127.0.0.1"),
+        "API_PORT": int(os.environ.get("API_PORT", 5001)),
+        "TELEGRAM_TOKEN": os.environ.get("TELEGRAM_TOKEN"),
+        # Upper bound on ids accepted by /movies/batch
+        "MAX_BATCH_SIZE": int(os.environ.get("MAX_BATCH_SIZE", 50)),
+        "RELATED_TOP_K": int(os.environ.get("RELATED_TOP_K", 20)),
+        "RELATED_INDEX_REFRESH_SECONDS": int(os.environ.get("RELATED_INDEX_REFRESH_SECONDS", 30)),
+        "RELATED_INDEX_REBUILD_SECONDS": int(os.environ.get("RELATED_INDEX_REBUILD_SECONDS", 3600)),
+        # Unfiltered per-category/per-DJ movie counts are reused for this long
+        "FACET_CACHE_SECONDS": int(os.environ.get("FACET_CACHE_SECONDS", 30)),
+    }
+
+def db_settings(config):
+    return {
+        "host": config["DB_HOST"],
+        "port": config["DB_PORT"],
+        "user": config["DB_USER"],
+        "password": config["DB_PASSWORD"],
+        "database": config["DB_NAME"],
+    }
 
-# Database connection
+# Create Flask app
+def create_app(config=None):
+    app = Flask(__name__, static_folder="build", static_url_path="/")
+    app.config.update(load_config())
+    if config:
+        app.config.update(config)
+    CORS(app)
+
+    driver = load_driver(app.config["DB_DRIVER"])
+    # Per-app state shared by all requests: connection pool, related-movies index and facet cache
+    app.extensions["movie_api"] = {
+        "pool": ConnectionPool(driver, db_settings(app.config), size=app.config["DB_POOL_SIZE"]),
+        "related_index": RelatedIndex(top_k=app.config["RELATED_TOP_K"]),
+        "related_index_state": {"built_at": 0.0, "checked_at": 0.0, "lock": threading.Lock()},
+        "facet_cache": {"counts": None, "computed_at": 0.0},
+    }
+    app.register_blueprint(api)
+    logger.info(f"✅ Movie API using the {driver.name} driver")
+    return app
+
+def get_state():
+    return current_app.extensions["movie_api"]
+
+# Database connection, borrowed from the pool until the request ends
 def get_db_connection():
-    db_host = os.environ.get("DB_HOST")
-    db_port = os.environ.get("DB_PORT")
-    db_user = os.environ.get("DB_USER")
-    db_password = os.environ.get("DB_PASSWORD")
-    db_name = os.environ.get("DB_NAME")
-
-    if not all([db_host, db_port, db_user, db_password, db_name]):
-        logger.error("❌ One or more database environment variables are not set.")
-        return None
+    if "db_conn" not in g:
+        g.db_conn = get_state()["pool"].acquire()
+    return g.db_conn
 
-    try:
-        connection = pymysql.connect(
-            host=db_host,
-            port=int(db_port),
-            user=db_user,
-            password=db_password,
-            database=db_name,
-            autocommit=True,
-            charset='utf8mb4',
-            cursorclass=DictCursor
-        )
-        return connection
-    except pymysql.MySQLError as err:
-        logger.error(f"❌ DB Connection Error: {err}")
-        return None
+@api.teardown_app_request
+def release_db_connection(exc):
+    conn = g.pop("db_conn", None)
+    if conn is not None:
+        get_state()["pool"].release(conn)
 
 # Telegram file URL retrieval
-def get_fresh_telegram_url(file_id):
+def get_fresh_telegram_url(file_id, telegram_token=None):
     if not file_id:
         logger.warning("⚠️ file_id is empty")
         return None
 
     try:
-        telegram_token = os.environ.get("TELEGRAM_TOKEN")
+        telegram_token = telegram_token or current_app.config["TELEGRAM_TOKEN"]
         if not telegram_token:
             logger.error("❌ TELEGRAM_TOKEN environment variable is not set.")
             return None
@@ -97,15 +145,194 @@ def enhance_movie_data(movie):
         logger.error(f"❌ Error enhancing movie data: {e}")
         return movie
 
-@app.route("/", methods=["GET"])
+# Enhance a list of movies, resolving each distinct Telegram file_id only once
+def enhance_movies_data(movies):
+    file_ids = set()
+    for movie in movies:
+        video_link = movie.get('video_link')
+        if video_link and not video_link.startswith('http'):
+            file_ids.add(video_link)
+        if movie.get('poster_file_id'):
+            file_ids.add(movie['poster_file_id'])
+
+    urls = {}
+    telegram_token = current_app.config["TELEGRAM_TOKEN"]
+    if file_ids and telegram_token:
+        # Worker threads have no app context, so hand them the token directly
+        with ThreadPoolExecutor(max_workers=min(8, len(file_ids))) as executor:
+            urls = dict(zip(file_ids, executor.map(
+                lambda file_id: get_fresh_telegram_url(file_id, telegram_token), file_ids
+            )))
+    elif file_ids:
+        logger.error("❌ TELEGRAM_TOKEN environment variable is not set.")
+
+    for movie in movies:
+        video_link = movie.get('video_link')
+        movie['video_url'] = (
+            video_link if video_link and video_link.startswith('http') else urls.get(video_link)
+        )
+        movie['poster_url'] = urls.get(movie.get('poster_file_id'))
+    return movies
+
+# Parse ids from ?ids=1,2,3 or a JSON body {"ids": [1, 2, 3]}
+def parse_batch_ids():
+    if request.method == "POST":
+        body = request.get_json(silent=True)
+        if not isinstance(body, dict):
+            raise ValueError('Request body must be a JSON object like {"ids": [1, 2, 3]}')
+        raw_ids = body.get("ids", [])
+    else:
+        raw_ids = [part.strip() for part in request.args.get("ids", "").split(",") if part.strip()]
+
+    if not isinstance(raw_ids, list):
+        raise ValueError("ids must be a list")
+
+    ids = []
+    for movie_id in raw_ids:
+        # Only whole numbers: int(1.9) would silently become 1
+        if isinstance(movie_id, str) and movie_id.isdecimal():
+            movie_id = int(movie_id)
+        if not isinstance(movie_id, int) or isinstance(movie_id, bool):
+            raise ValueError("ids must be integers")
+        ids.append(movie_id)
+    return ids
+
+# Fetch and enhance several movies in one query, keyed by id
+def fetch_movies_by_ids(conn, ids):
+    unique_ids = list(dict.fromkeys(ids))
+    if not unique_ids:
+        return {}
+    placeholders = ", ".join(["%s"] * len(unique_ids))
+    with conn.cursor() as cursor:
+        cursor.execute(MOVIE_SELECT + f" WHERE m.id IN ({placeholders})", tuple(unique_ids))
+        rows = cursor.fetchall()
+    return {movie['id']: movie for movie in enhance_movies_data(rows)}
+
+# Keep the related-movies index current from a background thread, so requests
+# always serve the last finished index: a full rebuild now and then (to pick up
+# edits), otherwise only fold in rows the bot inserted since the last check
+@api.before_app_request
+def schedule_related_refresh():
+    state = get_state()["related_index_state"]
+    if time.monotonic() - state["checked_at"] < current_app.config["RELATED_INDEX_REFRESH_SECONDS"]:
+        return
+    # Only one refresh runs at a time; other requests skip straight past
+    if not state["lock"].acquire(blocking=False):
+        return
+    threading.Thread(
+        target=refresh_related_index, args=(current_app._get_current_object(),), daemon=True
+    ).start()
+
+def refresh_related_index(app):
+    extension = app.extensions["movie_api"]
+    state = extension["related_index_state"]
+    conn = extension["pool"].acquire()
+    try:
+        if not conn:
+            return
+        now = time.monotonic()
+        full = not state["built_at"] or now - state["built_at"] > app.config["RELATED_INDEX_REBUILD_SECONDS"]
+
+        with conn.cursor() as cursor:
+            query = "SELECT id, title, category_id, dj_id, created_at FROM movies"
+            if full:
+                cursor.execute(query)
+            else:
+                cursor.execute(query + " WHERE id > %s ORDER BY id", (extension["related_index"].max_id,))
+            rows = cursor.fetchall()
+
+        if full:
+            # Build on the side and swap it in, so lookups never see a half-built index
+            related_index = RelatedIndex(top_k=app.config["RELATED_TOP_K"])
+            related_index.build(rows)
+            extension["related_index"] = related_index
+            state["built_at"] = now
+        elif rows:
+            extension["related_index"].add(rows)
+            logger.info(f"✅ Added {len(rows)} new movies to related index")
+    except Exception as e:
+        logger.error(f"❌ Error refreshing related index: {e}")
+    finally:
+        if conn:
+            extension["pool"].release(conn)
+        # Also set on failure, so a broken DB is retried once per refresh interval
+        state["checked_at"] = time.monotonic()
+        state["lock"].release()
+
+# Truthy query flag such as ?counts=1 or ?facets=true
+def arg_flag(name):
+    return request.args.get(name, "").lower() in ("1", "true", "yes")
+
+# Build the WHERE clause shared by /movies and its facet counts
+def movie_filters(search="", category_id=None, dj_id=None):
+    clause = " WHERE 1=1"
+    params = []
+    if search:
+        clause += " AND m.title LIKE %s"
+        params.append(f"%{search}%")
+    if category_id:
+        clause += " AND m.category_id = %s"
+        params.append(category_id)
+    if dj_id:
+        clause += " AND m.dj_id = %s"
+        params.append(dj_id)
+    return clause, params
+
+FACET_COLUMNS = {"categories": "category_id", "djs": "dj_id"}
+
+# Count movies per category or per DJ with a GROUP BY over the indexed foreign key
+def count_facet(conn, facet, search="", category_id=None, dj_id=None):
+    column = FACET_COLUMNS[facet]
+    clause, params = movie_filters(search, category_id, dj_id)
+    with conn.cursor() as cursor:
+        cursor.execute(
+            f"SELECT m.{column} AS id, COUNT(*) AS count FROM movies m{clause} GROUP BY m.{column}",
+            tuple(params)
+        )
+        return {row['id']: row['count'] for row in cursor.fetchall() if row['id'] is not None}
+
+# Count facets from rows that are already loaded, without another query
+def count_facets_in_rows(rows, facets):
+    counts = {}
+    for facet in facets:
+        column = FACET_COLUMNS[facet]
+        counts[facet] = dict(Counter(row[column] for row in rows if row[column] is not None))
+    return counts
+
+# Unfiltered counts for every facet, cached for FACET_CACHE_SECONDS
+def count_all_facets(conn):
+    facet_cache = get_state()["facet_cache"]
+    now = time.monotonic()
+    if facet_cache["counts"] is None or now - facet_cache["computed_at"] > current_app.config["FACET_CACHE_SECONDS"]:
+        facet_cache["counts"] = {facet: count_facet(conn, facet) for facet in FACET_COLUMNS}
+        facet_cache["computed_at"] = now
+    return facet_cache["counts"]
+
+# Facet counts for a /movies listing. Each facet ignores its own filter so the UI can
+# show what switching to another value would return; a facet whose own filter is unset
+# counts exactly the listed rows, so only the others need a query.
+def get_facet_counts(conn, rows, search="", category_id=None, dj_id=None):
+    filters = {"category_id": category_id, "dj_id": dj_id}
+    counts = count_facets_in_rows(rows, [facet for facet, column in FACET_COLUMNS.items() if not filters[column]])
+    for facet, column in FACET_COLUMNS.items():
+        if facet in counts:
+            continue
+        other_filters = dict(filters, **{column: None})
+        if search or any(other_filters.values()):
+            counts[facet] = count_facet(conn, facet, search, **other_filters)
+        else:
+            counts[facet] = count_all_facets(conn)[facet]
+    return counts
+
+@api.route("/", methods=["GET"])
 def index():
     return jsonify({"message": "Welcome to the Movie API"})
 
-@app.route('/favicon.ico')
+@api.route('/favicon.ico')
 def favicon():
-    return send_from_directory(app.root_path, 'static/favicon.ico', mimetype='image/vnd.microsoft.icon')
+    return send_from_directory(current_app.root_path, 'static/favicon.ico', mimetype='image/vnd.microsoft.icon')
 
-@app.route("/movies", methods=["GET"])
+@api.route("/movies", methods=["GET"])
 def get_movies():
     try:
         search = request.args.get("search", "")
@@ -117,40 +344,29 @@ def get_movies():
             return jsonify({"success": False, "error": "DB connection failed"}), 500
 
         with conn.cursor() as cursor:
-            query = """
-            SELECT m.*, c.name AS category_name, d.name AS dj_name, d.id AS dj_id
-            FROM movies m
-            LEFT JOIN categories c ON m.category_id = c.id
-            LEFT JOIN djs d ON m.dj_id = d.id
-            WHERE 1=1
-            """
-            params = []
-            if search:
-                query += " AND m.title LIKE %s"
-                params.append(f"%{search}%")
-            if category_id:
-                query += " AND m.category_id = %s"
-                params.append(category_id)
-            if dj_id:
-                query += " AND m.dj_id = %s"
-                params.append(dj_id)
-
-            query += " ORDER BY m.created_at DESC"
-            cursor.execute(query, tuple(params))
+            clause, params = movie_filters(search, category_id, dj_id)
+            cursor.execute(MOVIE_SELECT + clause + " ORDER BY m.created_at DESC", tuple(params))
             rows = cursor.fetchall()
 
         movies = [enhance_movie_data(movie) for movie in rows]
-        return jsonify({
+        response = {
             "success": True,
             "count": len(movies),
             "data": movies,
             "generated_at": datetime.now().isoformat()
-        })
+        }
+        if arg_flag("facets"):
+            facets = get_facet_counts(conn, rows, search, category_id, dj_id)
+            response["facets"] = {
+                facet: [{"id": facet_id, "count": count} for facet_id, count in facets[facet].items()]
+                for facet in FACET_COLUMNS
+            }
+        return jsonify(response)
     except Exception as e:
         logger.error(f"❌ Error fetching movies: {e}")
         return jsonify({"success": False, "error": str(e)}), 500
 
-@app.route("/movie/<int:movie_id>", methods=["GET"])
+@api.route("/movie/<int:movie_id>", methods=["GET"])
 def get_movie(movie_id):
     try:
         conn = get_db_connection()
@@ -158,13 +374,7 @@ def get_movie(movie_id):
             return jsonify({"success": False, "error": "DB connection failed"}), 500
 
         with conn.cursor() as cursor:
-            cursor.execute("""
-                SELECT m.*, c.name AS category_name, d.name AS dj_name, d.id AS dj_id
-                FROM movies m
-                LEFT JOIN categories c ON m.category_id = c.id
-                LEFT JOIN djs d ON m.dj_id = d.id
-                WHERE m.id = %s
-            """, (movie_id,))
+            cursor.execute(MOVIE_SELECT + " WHERE m.id = %s", (movie_id,))
             movie = cursor.fetchone()
 
         if movie:
@@ -175,7 +385,75 @@ def get_movie(movie_id):
         logger.error(f"❌ Error fetching movie by ID: {e}")
         return jsonify({"success": False, "error": str(e)}), 500
 
-@app.route("/categories", methods=["GET"])
+@api.route("/movies/batch", methods=["GET", "POST"])
+def get_movies_batch():
+    try:
+        ids = parse_batch_ids()
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+
+    if not ids:
+        return jsonify({"success": False, "error": "No movie ids provided"}), 400
+    max_batch_size = current_app.config["MAX_BATCH_SIZE"]
+    if len(ids) > max_batch_size:
+        return jsonify({"success": False, "error": f"Too many ids (max {max_batch_size})"}), 400
+
+    try:
+        conn = get_db_connection()
+        if not conn:
+            return jsonify({"success": False, "error": "DB connection failed"}), 500
+
+        found = fetch_movies_by_ids(conn, ids)
+        results = [
+            {"id": movie_id, "found": True, "data": found[movie_id]} if movie_id in found
+            else {"id": movie_id, "found": False, "error": "Movie not found"}
+            for movie_id in ids
+        ]
+        return jsonify({
+            "success": True,
+            "count": len(results),
+            "found": sum(1 for result in results if result["found"]),
+            "data": results,
+            "generated_at": datetime.now().isoformat()
+        })
+    except Exception as e:
+        logger.error(f"❌ Error fetching movie batch: {e}")
+        return jsonify({"success": False, "error": str(e)}), 500
+
+@api.route("/movie/<int:movie_id>/related", methods=["GET"])
+def get_related_movies(movie_id):
+    try:
+        if not get_state()["related_index_state"]["built_at"]:
+            return jsonify({"success": False, "error": "Related movies are still being indexed"}), 503
+
+        related_index = get_state()["related_index"]
+        limit = min(max(request.args.get("limit", 10, type=int), 1), related_index.top_k)
+        neighbours = related_index.related(movie_id, limit)
+        if neighbours is None:
+            return jsonify({"success": False, "error": "Movie not found"}), 404
+
+        conn = get_db_connection()
+        if not conn:
+            return jsonify({"success": False, "error": "DB connection failed"}), 500
+
+        found = fetch_movies_by_ids(conn, [related_id for related_id, _ in neighbours])
+        movies = []
+        for related_id, score in neighbours:
+            if related_id in found:
+                movies.append(dict(found[related_id], similarity=round(score, 4)))
+
+        return jsonify({
+            "success": True,
+            "movie_id": movie_id,
+            "count": len(movies),
+            "data": movies,
+            "generated_at": datetime.now().isoformat()
+        })
+    except Exception as e:
+        logger.error(f"❌ Error fetching related movies: {e}")
+        return jsonify({"success": False, "error": str(e)}), 500
+
+@api.route("/categories", methods=["GET"])
 def get_categories():
     try:
         conn = get_db_connection()
@@ -186,12 +464,17 @@ def get_categories():
             cursor.execute("SELECT * FROM categories ORDER BY name")
             categories = cursor.fetchall()
 
+        if arg_flag("counts"):
+            counts = count_all_facets(conn)["categories"]
+            for row in categories:
+                row["movie_count"] = counts.get(row["id"], 0)
+
         return jsonify({"success": True, "data": categories})
     except Exception as e:
         logger.error(f"❌ Error fetching categories: {e}")
         return jsonify({"success": False, "error": str(e)}), 500
 
-@app.route("/djs", methods=["GET"])
+@api.route("/djs", methods=["GET"])
 def get_djs():
     try:
         conn = get_db_connection()
@@ -202,12 +485,17 @@ def get_djs():
             cursor.execute("SELECT * FROM djs ORDER BY name")
             djs = cursor.fetchall()
 
+        if arg_flag("counts"):
+            counts = count_all_facets(conn)["djs"]
+            for row in djs:
+                row["movie_count"] = counts.get(row["id"], 0)
+
         return jsonify({"success": True, "data": djs})
     except Exception as e:
         logger.error(f"❌ Error fetching DJs: {e}")
         return jsonify({"success": False, "error": str(e)}), 500
 
-@app.route('/stream_video')
+@api.route('/stream_video')
 def stream_video():
     video_url = request.args.get('url')
     if not video_url:
@@ -223,7 +511,7 @@ def stream_video():
                 for chunk in response.iter_content(chunk_size=4096):
                     yield chunk
 
-            resp = make_response(app.response_class(generate(), content_type=response.headers.get('Content-Type')))
+            resp = make_response(current_app.response_class(generate(), content_type=response.headers.get('Content-Type')))
             resp.headers['Access-Control-Allow-Origin'] = '*'
             resp.headers['Cache-Control'] = 'public, max-age=31536000'
             return resp
@@ -233,3 +521,8 @@ def stream_video():
     except Exception as e:
         logger.error(f"❌ Error streaming video: {e}")
         return f"Internal server error: {e}", 500
+
+app = create_app()
+
+if __name__ == "__main__":
+    app.run(debug=app.config["DEBUG"], host=app.config["API_HOST"], port=app.config["API_PORT"])
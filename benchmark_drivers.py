@@ -0,0 +1,106 @@
+"""Compare the pymysql and mysql-connector drivers on the API's query mix.
+
+Uses the same DB_* environment variables as api.py and only runs read
+queries. Pick the faster driver with DB_DRIVER in production.
+
+    python benchmark_drivers.py --iterations 200
+"""
+import argparse
+import statistics
+import time
+
+from api import FACET_COLUMNS, MOVIE_SELECT, count_facet, db_settings, load_config, movie_filters
+from db import DRIVERS, ConnectionPool, load_driver
+
+
+def query_mix(conn, movie_ids):
+    """(name, callable) pairs mirroring what the API routes send to MySQL."""
+    batch_ids = movie_ids[:20] or [0]
+    placeholders = ", ".join(["%s"] * len(batch_ids))
+
+    def run(sql, params=(), fetch="fetchall"):
+        def execute():
+            with conn.cursor() as cursor:
+                cursor.execute(sql, params)
+                getattr(cursor, fetch)()
+        return execute
+
+    clause, params = movie_filters()
+    search_clause, search_params = movie_filters(search="a")
+    return [
+        ("movies", run(MOVIE_SELECT + clause + " ORDER BY m.created_at DESC", tuple(params))),
+        ("movies?search", run(MOVIE_SELECT + search_clause + " ORDER BY m.created_at DESC", tuple(search_params))),
+        ("movie/<id>", run(MOVIE_SELECT + " WHERE m.id = %s", (movie_ids[0] if movie_ids else 0,), "fetchone")),
+        ("movies/batch", run(MOVIE_SELECT + f" WHERE m.id IN ({placeholders})", tuple(batch_ids))),
+        ("categories", run("SELECT * FROM categories ORDER BY name")),
+        ("djs", run("SELECT * FROM djs ORDER BY name")),
+        ("facet counts", lambda: {facet: count_facet(conn, facet) for facet in FACET_COLUMNS}),
+        ("related index rows", run("SELECT id, title, category_id, dj_id, created_at FROM movies")),
+    ]
+
+
+def time_calls(func, iterations):
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def benchmark_driver(name, settings, iterations):
+    driver = load_driver(name)
+    connect_ms = time_calls(lambda: driver.connect(settings).close(), max(10, iterations // 10))
+
+    pool = ConnectionPool(driver, settings, size=1)
+    conn = pool.acquire()
+    if conn is None:
+        raise SystemExit(f"❌ Could not connect with {name}")
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT id FROM movies ORDER BY id LIMIT 50")
+            movie_ids = [row["id"] for row in cursor.fetchall()]
+
+        results = {"connect": connect_ms}
+        for query_name, func in query_mix(conn, movie_ids):
+            func()  # warm up
+            results[query_name] = time_calls(func, iterations)
+        return results
+    finally:
+        pool.release(conn)
+
+
+def summarize(samples):
+    if len(samples) < 2:
+        return samples[0], samples[0]
+    return statistics.median(samples), statistics.quantiles(samples, n=20, method="inclusive")[-1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=100)
+    parser.add_argument("--drivers", nargs="+", default=list(DRIVERS), choices=list(DRIVERS))
+    args = parser.parse_args()
+
+    settings = db_settings(load_config())
+    results = {name: benchmark_driver(name, settings, args.iterations) for name in args.drivers}
+
+    print(f"{'query':<20}" + "".join(f"{name + ' p50/p95 ms':>32}" for name in args.drivers))
+    totals = dict.fromkeys(args.drivers, 0.0)
+    for query_name in results[args.drivers[0]]:
+        row = f"{query_name:<20}"
+        for name in args.drivers:
+            p50, p95 = summarize(results[name][query_name])
+            row += f"{p50:>22.3f} / {p95:<7.3f}"
+            if query_name != "connect":
+                totals[name] += p50
+        print(row)
+
+    print()
+    for name, total in sorted(totals.items(), key=lambda item: item[1]):
+        print(f"{name:<20}{total:>10.3f} ms per query mix (p50, pooled connection)")
+    print(f"Fastest: DB_DRIVER={min(totals, key=totals.get)}")
+
+
+if __name__ == "__main__":
+    main()
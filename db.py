@@ -0,0 +1,131 @@
+import logging
+import queue
+from contextlib import closing
+
+logger = logging.getLogger(__name__)
+
+
+# Each driver is imported lazily so only the configured one has to be installed
+class PyMySQLDriver:
+    name = "pymysql"
+
+    def __init__(self):
+        import pymysql
+        from pymysql.cursors import DictCursor
+
+        # Monkey patch BEFORE doing anything else
+        pymysql.install_as_MySQLdb()
+        self.module = pymysql
+        self.cursor_class = DictCursor
+        self.error = pymysql.MySQLError
+
+    def connect(self, config):
+        return self.module.connect(
+            host=config["host"],
+            port=int(config["port"]),
+            user=config["user"],
+            password=config["password"],
+            database=config["database"],
+            autocommit=True,
+            charset='utf8mb4',
+            cursorclass=self.cursor_class
+        )
+
+    def dict_cursor(self, raw):
+        return raw.cursor()
+
+
+class MySQLConnectorDriver:
+    name = "mysql-connector"
+
+    def __init__(self):
+        import mysql.connector
+
+        self.module = mysql.connector
+        self.error = mysql.connector.Error
+
+    def connect(self, config):
+        return self.module.connect(
+            host=config["host"],
+            port=int(config["port"]),
+            user=config["user"],
+            password=config["password"],
+            database=config["database"],
+            autocommit=True,
+            charset='utf8mb4'
+        )
+
+    def dict_cursor(self, raw):
+        # Buffered, so closing a cursor after fetchone() doesn't raise "Unread result found"
+        return raw.cursor(dictionary=True, buffered=True)
+
+
+DRIVERS = {
+    PyMySQLDriver.name: PyMySQLDriver,
+    MySQLConnectorDriver.name: MySQLConnectorDriver,
+}
+
+
+def load_driver(name):
+    try:
+        return DRIVERS[name]()
+    except KeyError:
+        raise ValueError(f"Unknown DB driver '{name}', expected one of: {', '.join(DRIVERS)}")
+
+
+class PooledConnection:
+    """Driver connection whose cursor() yields fully read dict rows and closes on exit.
+
+    Rows are keyed by column name, so queries must not select the same name
+    twice: pymysql renames the duplicate while mysql-connector overwrites it.
+    """
+
+    def __init__(self, raw, driver):
+        self.raw = raw
+        self.driver = driver
+
+    def cursor(self):
+        return closing(self.driver.dict_cursor(self.raw))
+
+
+class ConnectionPool:
+    """Small thread-safe pool that reuses connections across requests."""
+
+    def __init__(self, driver, config, size=5):
+        self.driver = driver
+        self.config = config
+        self.idle = queue.LifoQueue(maxsize=size)
+
+    def acquire(self):
+        if not all(self.config.get(key) for key in ("host", "port", "user", "password", "database")):
+            logger.error("❌ One or more database environment variables are not set.")
+            return None
+
+        while True:
+            try:
+                conn = self.idle.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                conn.raw.ping(reconnect=True)
+                return conn
+            except self.driver.error:
+                self._close(conn)
+
+        try:
+            return PooledConnection(self.driver.connect(self.config), self.driver)
+        except self.driver.error as err:
+            logger.error(f"❌ DB Connection Error: {err}")
+            return None
+
+    def release(self, conn):
+        try:
+            self.idle.put_nowait(conn)
+        except queue.Full:
+            self._close(conn)
+
+    def _close(self, conn):
+        try:
+            conn.raw.close()
+        except self.driver.error:
+            pass
@@ -0,0 +1,163 @@
+import re
+import logging
+import threading
+from datetime import datetime
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Weights for the similarity components
+DJ_WEIGHT = 3.0
+CATEGORY_WEIGHT = 2.0
+TITLE_WEIGHT = 4.0
+RECENCY_WEIGHT = 1.0
+# Days over which the recency bonus decays by a factor of e
+RECENCY_SCALE_DAYS = 30.0
+# Rows compared at once during a full build
+BUILD_BATCH_SIZE = 512
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def tokenize_title(title):
+    return set(TOKEN_RE.findall((title or "").lower()))
+
+
+def to_timestamp(value):
+    if isinstance(value, datetime):
+        return value.timestamp()
+    # Undated rows get no recency term at all
+    return np.nan
+
+
+class RelatedIndex:
+    """Precomputed top-k "more like this" neighbours for every movie.
+
+    Scores combine shared DJ, shared category, title token overlap (Jaccard)
+    and how close the movies were added. Titles are kept in an inverted
+    token index, so memory grows with the number of title words rather than
+    catalog size times vocabulary. Queries are a dict lookup; new movies are
+    folded in with a single vectorized pass over the catalog.
+    """
+
+    def __init__(self, top_k=20):
+        self.top_k = top_k
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.ids = []
+        self.positions = {}
+        self.postings = {}
+        self.row_tokens = []
+        self.token_counts = np.empty(0, dtype=np.float32)
+        self.dj_ids = np.empty(0, dtype=np.int64)
+        self.category_ids = np.empty(0, dtype=np.int64)
+        self.timestamps = np.empty(0, dtype=np.float64)
+        self.neighbours = {}
+
+    @property
+    def max_id(self):
+        return max(self.ids) if self.ids else 0
+
+    def __len__(self):
+        return len(self.ids)
+
+    def _append_rows(self, movies):
+        new_counts = []
+        for movie in movies:
+            row = len(self.row_tokens)
+            tokens = sorted(tokenize_title(movie.get('title')))
+            for token in tokens:
+                self.postings.setdefault(token, []).append(row)
+            self.row_tokens.append(tokens)
+            new_counts.append(len(tokens))
+        self.token_counts = np.concatenate([self.token_counts, np.array(new_counts, dtype=np.float32)])
+
+        # Missing DJs/categories are stored as -1 and masked out in _scores
+        self.dj_ids = np.concatenate([self.dj_ids, [movie.get('dj_id') or -1 for movie in movies]])
+        self.category_ids = np.concatenate([self.category_ids, [movie.get('category_id') or -1 for movie in movies]])
+        self.timestamps = np.concatenate([self.timestamps, [to_timestamp(movie.get('created_at')) for movie in movies]])
+        for movie in movies:
+            self.positions[movie['id']] = len(self.ids)
+            self.ids.append(movie['id'])
+
+    def _scores(self, rows):
+        """Similarity of each movie at positions `rows` against the whole catalog."""
+        overlap = np.zeros((len(rows), len(self.ids)), dtype=np.float32)
+        for offset, row in enumerate(rows):
+            postings = [self.postings[token] for token in self.row_tokens[row]]
+            if postings:
+                overlap[offset] = np.bincount(np.concatenate(postings), minlength=len(self.ids))
+
+        token_counts = self.token_counts
+        union = token_counts[rows, None] + token_counts[None, :] - overlap
+        jaccard = np.divide(overlap, union, out=np.zeros_like(overlap), where=union > 0)
+
+        same_dj = (self.dj_ids[rows, None] == self.dj_ids[None, :]) & (self.dj_ids[rows, None] >= 0)
+        same_category = (
+            (self.category_ids[rows, None] == self.category_ids[None, :]) & (self.category_ids[rows, None] >= 0)
+        )
+        age_days = np.abs(self.timestamps[rows, None] - self.timestamps[None, :]) / 86400.0
+        recency = np.nan_to_num(np.exp(-age_days / RECENCY_SCALE_DAYS), nan=0.0)
+        scores = (
+            DJ_WEIGHT * same_dj
+            + CATEGORY_WEIGHT * same_category
+            + TITLE_WEIGHT * jaccard
+            + RECENCY_WEIGHT * recency
+        )
+        scores[np.arange(len(rows)), rows] = -np.inf
+        return scores
+
+    def _top_neighbours(self, scores):
+        k = min(self.top_k, scores.shape[0] - 1)
+        if k <= 0:
+            return []
+        best = np.argpartition(-scores, k - 1)[:k]
+        best = best[np.argsort(-scores[best])]
+        return [(self.ids[col], float(scores[col])) for col in best]
+
+    def build(self, movies):
+        """Rebuild the whole index from `movies` (dicts with id, title, dj_id, category_id, created_at)."""
+        with self.lock:
+            self.reset()
+            if not movies:
+                return
+            self._append_rows(movies)
+            for start in range(0, len(self.ids), BUILD_BATCH_SIZE):
+                rows = np.arange(start, min(start + BUILD_BATCH_SIZE, len(self.ids)))
+                for row, scores in zip(rows, self._scores(rows)):
+                    self.neighbours[self.ids[row]] = self._top_neighbours(scores)
+        logger.info(f"✅ Related index built for {len(self.ids)} movies")
+
+    def add(self, movies):
+        """Fold newly saved movies into the index without a full rebuild."""
+        with self.lock:
+            movies = list({movie['id']: movie for movie in movies if movie['id'] not in self.positions}.values())
+            if not movies:
+                return
+            first_new = len(self.ids)
+            self._append_rows(movies)
+            rows = np.arange(first_new, len(self.ids))
+            scores = self._scores(rows)
+            for row, row_scores in zip(rows, scores):
+                self.neighbours[self.ids[row]] = self._top_neighbours(row_scores)
+
+            # Existing movies only need updating where a new title beats their weakest neighbour
+            best_new = scores[:, :first_new].max(axis=0)
+            for col in range(first_new):
+                movie_id = self.ids[col]
+                current = self.neighbours.get(movie_id, [])
+                if len(current) >= self.top_k and best_new[col] <= current[-1][1]:
+                    continue
+                candidates = [(self.ids[row], float(score)) for row, score in zip(rows, scores[:, col])]
+                merged = sorted(current + candidates, key=lambda item: item[1], reverse=True)
+                self.neighbours[movie_id] = merged[:self.top_k]
+
+    def related(self, movie_id, limit=10):
+        """Return [(movie_id, score), ...] for the closest matches, or None for unknown ids."""
+        neighbours = self.neighbours.get(movie_id)
+        if neighbours is None:
+            return None
+        return neighbours[:limit]